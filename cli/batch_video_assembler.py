@@ -40,6 +40,7 @@ def main():
     parser.add_argument("--subtitle-only", action="store_true", help="僅生成字幕")
     parser.add_argument("--video-only", action="store_true", help="僅合成影片")
     parser.add_argument("--no-debug", action="store_true", help="關閉除錯資訊（預設為開啟）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用 Whisper / AI 斷句快取，一律重新呼叫 API")
     parser.add_argument(
         "--preset", 
         choices=["ultrafast", "veryfast", "fast", "medium"],
@@ -93,7 +94,9 @@ def main():
         if args.subtitle_only:
             # 僅生成字幕
             print("📝 模式：僅生成字幕")
-            srt_path = processor.generate_subtitle_only(folder_path, debug=debug_mode)
+            srt_path = processor.generate_subtitle_only(
+                folder_path, debug=debug_mode, use_cache=not args.no_cache
+            )
             print(f"\n✅ 字幕生成完成：{srt_path}")
             
         elif args.video_only:
@@ -116,7 +119,8 @@ def main():
                 output_path,
                 skip_subtitle=args.skip_subtitle,
                 encoding_preset=args.preset,
-                debug=debug_mode
+                debug=debug_mode,
+                use_cache=not args.no_cache
             )
             print(f"\n✅ 處理完成：{video_path}")
             
@@ -50,6 +50,44 @@ class SubtitleConfig:
     ASS_MARGIN_V = 80  # 垂直邊距（會被 CENTER_Y 覆蓋計算）
 
 
+# ============================================================
+# 語音辨識設定
+# ============================================================
+class WhisperConfig:
+    # 語音辨識後端（可用環境變數 WHISPER_BACKEND 覆寫）
+    # - "openai"：OpenAI Whisper API（雲端）
+    # - "faster-whisper"：本機執行（需安裝 faster-whisper，有 GPU 時最快）
+    BACKEND = os.getenv("WHISPER_BACKEND", "openai")
+    # faster-whisper 模型設定
+    LOCAL_MODEL = os.getenv("WHISPER_LOCAL_MODEL", "large-v3")
+    LOCAL_DEVICE = os.getenv("WHISPER_LOCAL_DEVICE", "auto")
+    LOCAL_COMPUTE_TYPE = os.getenv("WHISPER_LOCAL_COMPUTE_TYPE", "default")
+
+
+# ============================================================
+# 快取設定
+# ============================================================
+class CacheConfig:
+    # Whisper 與 AI 斷句結果的快取目錄（可用環境變數 VIDEO_ASSEMBLER_CACHE_DIR 覆寫）
+    CACHE_DIR = Path(
+        os.getenv("VIDEO_ASSEMBLER_CACHE_DIR")
+        or Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "video_assembler"
+    )
+    # 是否快取 AI 斷句結果（預設關閉：斷句模型溫度不為 0，重跑時通常希望得到新的斷句）
+    CACHE_SEGMENTS = os.getenv("CACHE_SEGMENTS", "").lower() in ("1", "true", "yes")
+
+
+# ============================================================
+# 字幕對齊設定
+# ============================================================
+class AlignmentConfig:
+    # Force Alignment 比對器（可用環境變數 ALIGNMENT_MATCHER 覆寫）
+    # - "difflib"：Ratcliff-Obershelp（SequenceMatcher）
+    # - "levenshtein"：最小編輯距離（需安裝 rapidfuzz，未安裝時退回 difflib）
+    # - "dtw"：Numba JIT 的 DTW 動態規劃（需安裝 numba，未安裝時退回 difflib）
+    MATCHER = os.getenv("ALIGNMENT_MATCHER", "difflib")
+
+
 # ============================================================
 # Avatar 設定
 # ============================================================
@@ -0,0 +1,245 @@
+"""
+對齊引擎 - 字幕時間戳對齊的數值核心
+有安裝 Numba 時以 JIT 編譯成機器碼執行，否則退回純 Python 實作（或由呼叫端改用 difflib）
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+
+# ============================================================
+# 工具函數
+# ============================================================
+def to_codepoints(text: str) -> np.ndarray:
+    """將字串轉為 Unicode code point 陣列（int32），供 JIT 核心做整數比對"""
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.int32)
+
+
+# ============================================================
+# Step 2：Force Alignment（DTW）
+# ============================================================
+# 路徑步驟代碼，對應 SequenceMatcher opcodes 的 tag
+EQUAL, REPLACE, DELETE, INSERT = 0, 1, 2, 3
+OPCODE_TAGS = ('equal', 'replace', 'delete', 'insert')
+
+
+# Sakoe-Chiba 帶寬：至少 MIN_BAND，且涵蓋兩序列的長度差；結果不保證最佳時加倍重算
+MIN_BAND = 64
+BAND_MARGIN = 32
+# 回溯矩陣的格數上限（int8，約 64MB），帶寬加倍超過時交由呼叫端改用其他比對器
+MAX_BAND_CELLS = 64 * 1024 * 1024
+# 帶外格子的成本
+_INF = 1 << 30
+
+
+def _edit_opcodes(a_cp, b_cp, band):
+    """
+    以動態規劃求 a → b 的最小成本單調對齊路徑，並合併為 opcodes
+    
+    遞迴式同 DTW：C[i,j] = min(C[i-1,j-1] + d(i,j), C[i-1,j] + 1, C[i,j-1] + 1)，
+    字元相同時 d = 0、不同時 d = 1；額外的 +1 讓 Whisper 多出/漏掉的字成為 delete/insert，
+    而不是被硬配到相鄰字元上。
+    
+    只計算對角線 j ≈ i·M/N 兩側 band 格內的 Sakoe-Chiba 帶：
+    成本只保留兩列，回溯方向存成 (N+1)×(2·band+1) 的 int8 矩陣，記憶體為 O(N·band) 而非 O(N·M)。
+    
+    Returns:
+        int64 陣列，每列為 (tag 代碼, i1, i2, j1, j2)
+    """
+    n = a_cp.shape[0]
+    m = b_cp.shape[0]
+    
+    # 每列在帶內的欄位範圍 [lo[i], hi[i]]（隨 i 單調不減）
+    lo = np.empty(n + 1, dtype=np.int64)
+    hi = np.empty(n + 1, dtype=np.int64)
+    for i in range(n + 1):
+        center = (i * m) // n if n > 0 else 0
+        lo[i] = max(0, center - band)
+        hi[i] = min(m, center + band)
+    lo[0] = 0
+    hi[n] = m
+    
+    back = np.empty((n + 1, 2 * band + 1), dtype=np.int8)
+    prev = np.empty(m + 1, dtype=np.int32)
+    curr = np.empty(m + 1, dtype=np.int32)
+    
+    for j in range(hi[0] + 1):
+        prev[j] = j
+        back[0, j] = INSERT
+    
+    for i in range(1, n + 1):
+        a_char = a_cp[i - 1]
+        prev_lo = lo[i - 1]
+        prev_hi = hi[i - 1]
+        row_lo = lo[i]
+        for j in range(row_lo, hi[i] + 1):
+            best = _INF
+            step = DELETE
+            if j > 0 and prev_lo <= j - 1 <= prev_hi:
+                if a_char == b_cp[j - 1]:
+                    best = prev[j - 1]
+                    step = EQUAL
+                else:
+                    best = prev[j - 1] + 1
+                    step = REPLACE
+            if prev_lo <= j <= prev_hi and prev[j] + 1 < best:
+                best = prev[j] + 1
+                step = DELETE
+            if j > row_lo and curr[j - 1] + 1 < best:
+                best = curr[j - 1] + 1
+                step = INSERT
+            curr[j] = best
+            back[i, j - row_lo] = step
+        prev, curr = curr, prev
+    
+    # 由 (n, m) 回溯到 (0, 0)，steps 為倒序
+    steps = np.empty(n + m, dtype=np.int8)
+    num_steps = 0
+    i = n
+    j = m
+    while i > 0 or j > 0:
+        step = back[i, j - lo[i]]
+        steps[num_steps] = step
+        num_steps += 1
+        if step == DELETE:
+            i -= 1
+        elif step == INSERT:
+            j -= 1
+        else:
+            i -= 1
+            j -= 1
+    
+    # 將連續相同的步驟合併為 opcodes
+    opcodes = np.empty((num_steps, 5), dtype=np.int64)
+    count = 0
+    i = 0
+    j = 0
+    p = num_steps - 1
+    while p >= 0:
+        step = steps[p]
+        i1 = i
+        j1 = j
+        while p >= 0 and steps[p] == step:
+            if step != INSERT:
+                i += 1
+            if step != DELETE:
+                j += 1
+            p -= 1
+        opcodes[count, 0] = step
+        opcodes[count, 1] = i1
+        opcodes[count, 2] = i
+        opcodes[count, 3] = j1
+        opcodes[count, 4] = j
+        count += 1
+    
+    return opcodes[:count]
+
+
+# nogil：多個段落可在不同執行緒上同時比對
+edit_opcodes = njit(cache=True, nogil=True)(_edit_opcodes) if NUMBA_AVAILABLE else _edit_opcodes
+
+
+def dtw_opcodes(a: str, b: str):
+    """
+    計算 a → b 的 opcodes（格式同 SequenceMatcher.get_opcodes）
+    
+    帶寬只預留長度差，Whisper 在中途漏掉或多出一大段時最佳路徑會偏離對角線而落在帶外。
+    最佳路徑離帶中心最多「編輯成本 + 長度差」格，因此帶內結果的成本滿足
+    cost + |N-M| < band 時即為最佳解；否則將帶寬加倍重算，直到涵蓋整個矩陣。
+    
+    Returns:
+        opcodes；所需帶寬的回溯矩陣超過 MAX_BAND_CELLS 時（含第一次計算）回傳 None
+    """
+    n, m = len(a), len(b)
+    length_diff = abs(n - m)
+    band = max(MIN_BAND, length_diff + BAND_MARGIN)
+    # 長度差很大時第一次的帶就可能超過上限，配置回溯矩陣前先檢查
+    if (n + 1) * (2 * band + 1) > MAX_BAND_CELLS:
+        return None
+    
+    a_cp, b_cp = to_codepoints(a), to_codepoints(b)
+    while True:
+        opcodes = edit_opcodes(a_cp, b_cp, band)
+        if band >= max(n, m):
+            break
+        # 每個非 equal 區段的成本為兩側長度的較大者（replace 兩側等長）
+        spans = np.maximum(opcodes[:, 2] - opcodes[:, 1], opcodes[:, 4] - opcodes[:, 3])
+        cost = int(spans[opcodes[:, 0] != EQUAL].sum())
+        if cost + length_diff < band:
+            break
+        band *= 2
+        if (n + 1) * (2 * band + 1) > MAX_BAND_CELLS:
+            return None
+    return [(OPCODE_TAGS[tag], i1, i2, j1, j2) for tag, i1, i2, j1, j2 in opcodes.tolist()]
+
+
+# ============================================================
+# Step 4：字幕行對齊
+# ============================================================
+def _match_line(chars_cp, starts, ends, line_cp, char_idx, current_time, search_window):
+    """
+    將一行字幕的字元依序匹配回 aligned_chars，取得該行的起訖時間
+
+    Args:
+        chars_cp: aligned_chars 的 code points
+        starts, ends: aligned_chars 每個字的起訖時間
+        line_cp: 字幕行的 code points（已排除空格與標點）
+        char_idx: 目前在 aligned_chars 的位置
+        current_time: 目前時間（超出 aligned_chars 時沿用）
+        search_window: 往後搜尋相同字元的範圍
+
+    Returns:
+        (has_start, start_time, end_time, char_idx, current_time, matched, fallback)
+    """
+    total_chars = chars_cp.shape[0]
+    has_start = False
+    start_time = 0.0
+    end_time = 0.0
+    matched = 0
+    fallback = 0
+
+    num_targets = line_cp.shape[0]
+    for p in range(num_targets):
+        if char_idx >= total_chars:
+            # 已超出 aligned_chars：其餘字元全部沿用 current_time，不必逐字處理
+            fallback += num_targets - p
+            if not has_start:
+                start_time = current_time
+                has_start = True
+            end_time = current_time
+            break
+        
+        target = line_cp[p]
+        found_idx = -1
+        for k in range(char_idx, min(char_idx + search_window, total_chars)):
+            if chars_cp[k] == target:
+                found_idx = k
+                break
+
+        if found_idx >= 0:
+            if not has_start:
+                start_time = starts[found_idx]
+                has_start = True
+            end_time = ends[found_idx]
+            current_time = end_time
+            char_idx = found_idx + 1
+            matched += 1
+        else:
+            fallback += 1
+            if not has_start:
+                start_time = starts[char_idx]
+                has_start = True
+            end_time = ends[char_idx]
+            current_time = end_time
+            char_idx += 1
+
+    return has_start, start_time, end_time, char_idx, current_time, matched, fallback
+
+
+match_line = njit(cache=True)(_match_line) if NUMBA_AVAILABLE else _match_line
@@ -190,13 +190,19 @@ def find_audio_offset(main_audio: np.ndarray, segment_audio: np.ndarray, sr: int
 # ============================================================
 # SRT → ASS 轉換
 # ============================================================
+# SRT 區塊：編號、起訖時間、字幕文字（可跨行）
+_SRT_BLOCK_RE = re.compile(
+    r"(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n(.+?)(?=\n\n|\n*$)",
+    re.DOTALL
+)
+
+
 def parse_srt(srt_path: Path) -> list:
     """解析 SRT 字幕檔案"""
     with open(srt_path, "r", encoding="utf-8") as f:
         content = f.read()
     
-    pattern = r"(\d+)\n(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\n(.+?)(?=\n\n|\n*$)"
-    matches = re.findall(pattern, content, re.DOTALL)
+    matches = _SRT_BLOCK_RE.findall(content)
     
     subtitles = []
     for match in matches:
@@ -1,5 +1,6 @@
 # Integrations module
 from .openai_client import OpenAIClient
 from .openrouter_client import OpenRouterClient
+from .faster_whisper_client import FasterWhisperClient
 
-__all__ = ['OpenAIClient', 'OpenRouterClient']
+__all__ = ['OpenAIClient', 'OpenRouterClient', 'FasterWhisperClient']
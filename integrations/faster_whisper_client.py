@@ -0,0 +1,84 @@
+"""
+faster-whisper 本機語音辨識客戶端
+以 CTranslate2 在本機執行 Whisper，省去上傳音檔與雲端排隊的時間
+"""
+
+import io
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import Optional
+
+from config import WhisperConfig
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+
+class FasterWhisperClient:
+    """
+    faster-whisper 客戶端
+    
+    介面與 OpenAIClient 的語音辨識相同，回傳物件同樣具有 duration 與 words
+    （每個 word 有 word / start / end），下游流程不需區分後端。
+    
+    模型在第一次辨識時才載入：只合成影片或 Whisper 快取命中時不必付出載入成本。
+    """
+    
+    def __init__(self):
+        if WhisperModel is None:
+            raise ImportError("❌ 錯誤：未安裝 faster-whisper（pip install faster-whisper）")
+        
+        self._model = None
+        self._model_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """本機 Whisper 模型（首次存取時載入，多個執行緒同時存取只載入一次）"""
+        with self._model_lock:
+            if self._model is None:
+                self._model = WhisperModel(
+                    WhisperConfig.LOCAL_MODEL,
+                    device=WhisperConfig.LOCAL_DEVICE,
+                    compute_type=WhisperConfig.LOCAL_COMPUTE_TYPE
+                )
+        return self._model
+    
+    def transcribe_audio(self, audio, language: str = "zh"):
+        """
+        使用本機 Whisper 模型進行語音辨識
+        
+        Args:
+            audio: 音訊檔案路徑，或 (檔名, bytes)（與 OpenAIClient 相同）
+            language: 語言代碼
+            
+        Returns:
+            具有 duration 與 words 屬性的結果
+        """
+        if isinstance(audio, tuple):
+            audio = io.BytesIO(audio[1])
+        else:
+            audio = str(audio)
+        
+        segments, info = self.model.transcribe(audio, language=language, word_timestamps=True)
+        words = [word for segment in segments for word in segment.words]
+        return SimpleNamespace(duration=info.duration, words=words)
+    
+    async def transcribe_audio_async(self, audio, language: str = "zh"):
+        """transcribe_audio 的非同步版本（推論在執行緒中進行，不阻塞 event loop）"""
+        return await asyncio.to_thread(self.transcribe_audio, audio, language)
+
+
+# 模組層級單例（模型載入成本高，載入後重複使用）
+_client: Optional[FasterWhisperClient] = None
+
+
+# 便捷函數：取得單例實例
+def get_faster_whisper_client() -> FasterWhisperClient:
+    """取得 faster-whisper 客戶端單例"""
+    global _client
+    if _client is None:
+        _client = FasterWhisperClient()
+    return _client
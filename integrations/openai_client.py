@@ -4,7 +4,9 @@ OpenAI API 客戶端封裝
 """
 
 import os
-from openai import OpenAI
+from pathlib import Path
+from typing import Optional
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
 # 載入環境變數
@@ -19,47 +21,64 @@ class OpenAIClient:
     DEFAULT_TEMPERATURE = 0.3
     WHISPER_MODEL = "whisper-1"
     
-    _instance = None
-    
-    def __new__(cls):
-        """Singleton pattern - 確保只有一個實例"""
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-    
     def __init__(self):
-        if self._initialized:
-            return
-            
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("❌ 錯誤：未設定 OPENAI_API_KEY 環境變數")
         
+        self.api_key = api_key
         self.client = OpenAI(api_key=api_key)
-        self._initialized = True
     
-    def transcribe_audio(self, audio_path, language: str = "zh") -> dict:
+    def _create_async_client(self) -> AsyncOpenAI:
+        """
+        建立非同步客戶端
+        
+        AsyncOpenAI 的連線池綁定建立時的 event loop，
+        而每次 asyncio.run 都是新的 loop，因此每次呼叫各自建立、用完即關閉。
+        """
+        return AsyncOpenAI(api_key=self.api_key)
+    
+    def transcribe_audio(self, audio, language: str = "zh") -> dict:
         """
         使用 Whisper API 進行語音辨識
         
         Args:
-            audio_path: 音訊檔案路徑
+            audio: 音訊檔案路徑，或 (檔名, bytes)（例如直接取自 ffmpeg stdout 的記憶體音訊；
+                   檔名的副檔名供 API 判斷格式）
             language: 語言代碼
             
         Returns:
             API 回傳的完整結果（包含 words 時間戳）
         """
-        with open(audio_path, "rb") as audio_file:
-            response = self.client.audio.transcriptions.create(
+        response = self.client.audio.transcriptions.create(
+            model=self.WHISPER_MODEL,
+            file=self._as_upload(audio),
+            language=language,
+            response_format="verbose_json",
+            timestamp_granularities=["word"]
+        )
+        return response
+    
+    async def transcribe_audio_async(self, audio, language: str = "zh") -> dict:
+        """transcribe_audio 的非同步版本，可與其他 API 呼叫並行"""
+        async with self._create_async_client() as client:
+            response = await client.audio.transcriptions.create(
                 model=self.WHISPER_MODEL,
-                file=audio_file,
+                file=self._as_upload(audio),
                 language=language,
                 response_format="verbose_json",
                 timestamp_granularities=["word"]
             )
         return response
     
+    @staticmethod
+    def _as_upload(audio) -> tuple:
+        """將音訊參數統一為 (檔名, bytes)；SDK 上傳前本來就會整檔讀進記憶體"""
+        if isinstance(audio, (str, os.PathLike)):
+            audio_path = Path(audio)
+            return audio_path.name, audio_path.read_bytes()
+        return audio
+    
     def chat_completion(
         self, 
         system_prompt: str, 
@@ -88,9 +107,35 @@ class OpenAIClient:
             ]
         )
         return response.choices[0].message.content
+    
+    async def chat_completion_async(
+        self, 
+        system_prompt: str, 
+        user_prompt: str,
+        model: str = None,
+        temperature: float = None
+    ) -> str:
+        """chat_completion 的非同步版本，可與其他 API 呼叫並行"""
+        async with self._create_async_client() as client:
+            response = await client.chat.completions.create(
+                model=model or self.DEFAULT_MODEL,
+                temperature=temperature or self.DEFAULT_TEMPERATURE,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ]
+            )
+        return response.choices[0].message.content
+
+
+# 模組層級單例（首次呼叫時才建立，避免 import 時就要求 API Key）
+_client: Optional[OpenAIClient] = None
 
 
 # 便捷函數：取得單例實例
 def get_openai_client() -> OpenAIClient:
     """取得 OpenAI 客戶端單例"""
-    return OpenAIClient()
+    global _client
+    if _client is None:
+        _client = OpenAIClient()
+    return _client
@@ -4,7 +4,8 @@ OpenRouter API 客戶端封裝
 """
 
 import os
-from openai import OpenAI
+from typing import Optional
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 
 # 載入環境變數
@@ -18,33 +19,70 @@ class OpenRouterClient:
     DEFAULT_MODEL = "anthropic/claude-sonnet-4.5"
     DEFAULT_TEMPERATURE = 1.0
     BASE_URL = "https://openrouter.ai/api/v1"
-    
-    _instance = None
-    
-    def __new__(cls):
-        """Singleton pattern - 確保只有一個實例"""
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
+    DEFAULT_HEADERS = {
+        "HTTP-Referer": "https://autovideomaker.local",
+        "X-Title": "AutoVideoMaker"
+    }
     
     def __init__(self):
-        if self._initialized:
-            return
-            
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key:
             raise ValueError("❌ 錯誤：未設定 OPENROUTER_API_KEY 環境變數")
         
+        self.api_key = api_key
         self.client = OpenAI(
             base_url=self.BASE_URL,
             api_key=api_key,
-            default_headers={
-                "HTTP-Referer": "https://autovideomaker.local",
-                "X-Title": "AutoVideoMaker"
-            }
+            default_headers=self.DEFAULT_HEADERS
+        )
+    
+    def _create_async_client(self) -> AsyncOpenAI:
+        """
+        建立非同步客戶端
+        
+        AsyncOpenAI 的連線池綁定建立時的 event loop，
+        而每次 asyncio.run 都是新的 loop，因此每次呼叫各自建立、用完即關閉。
+        """
+        return AsyncOpenAI(
+            base_url=self.BASE_URL,
+            api_key=self.api_key,
+            default_headers=self.DEFAULT_HEADERS
         )
-        self._initialized = True
+    
+    @staticmethod
+    def _build_messages(system_prompt: str, user_prompt: str, model: str) -> list:
+        """
+        組成 messages，讓固定不變的 system prompt 可被 prompt caching 重複使用
+        
+        Anthropic 模型需在內容區塊標記 cache_control 才會快取；
+        其他供應商（如 OpenAI）對相同前綴自動快取，維持純文字即可。
+        每次不同的內容只放在 user prompt，避免破壞快取前綴。
+        """
+        if model.startswith("anthropic/"):
+            system_content = [{
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        else:
+            system_content = system_prompt
+        
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    @staticmethod
+    def _log_cache_usage(response):
+        """印出 prompt caching 的命中情況（OpenRouter 以 prompt_tokens_details 統一回報）"""
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        if details is None:
+            return
+        cached = getattr(details, "cached_tokens", None) or 0
+        written = getattr(details, "cache_write_tokens", None) or 0
+        if cached or written:
+            print(f"   ♻️  Prompt 快取：讀取 {cached} / 寫入 {written} / 共 {usage.prompt_tokens} tokens")
     
     def chat_completion(
         self, 
@@ -65,18 +103,42 @@ class OpenRouterClient:
         Returns:
             回應文字內容
         """
+        model = model or self.DEFAULT_MODEL
         response = self.client.chat.completions.create(
-            model=model or self.DEFAULT_MODEL,
+            model=model,
             temperature=temperature or self.DEFAULT_TEMPERATURE,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
+            messages=self._build_messages(system_prompt, user_prompt, model)
         )
+        self._log_cache_usage(response)
         return response.choices[0].message.content
+    
+    async def chat_completion_async(
+        self, 
+        system_prompt: str, 
+        user_prompt: str,
+        model: str = None,
+        temperature: float = None
+    ) -> str:
+        """chat_completion 的非同步版本，可與其他 API 呼叫並行"""
+        async with self._create_async_client() as client:
+            model = model or self.DEFAULT_MODEL
+            response = await client.chat.completions.create(
+                model=model,
+                temperature=temperature or self.DEFAULT_TEMPERATURE,
+                messages=self._build_messages(system_prompt, user_prompt, model)
+            )
+        self._log_cache_usage(response)
+        return response.choices[0].message.content
+
+
+# 模組層級單例（首次呼叫時才建立，避免 import 時就要求 API Key）
+_client: Optional[OpenRouterClient] = None
 
 
 # 便捷函數：取得單例實例
 def get_openrouter_client() -> OpenRouterClient:
     """取得 OpenRouter 客戶端單例"""
-    return OpenRouterClient()
+    global _client
+    if _client is None:
+        _client = OpenRouterClient()
+    return _client
@@ -6,14 +6,306 @@
 import os
 import re
 import json
-import difflib
+import asyncio
+import hashlib
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+
+import numpy as np
 from opencc import OpenCC
 
+from config import AlignmentConfig, CacheConfig, ProcessingConfig, WhisperConfig
+from engines import alignment_engine
+from integrations.faster_whisper_client import get_faster_whisper_client
 from integrations.openai_client import get_openai_client
 from integrations.openrouter_client import get_openrouter_client
 
+# Force Alignment 比對器：優先使用 C 實作的 difflib（API 與 opcodes 結果皆相同），
+# 依序嘗試 cydifflib（Cython）、cdifflib（C 擴充），都沒有時退回標準庫
+try:
+    from cydifflib import SequenceMatcher
+except ImportError:
+    try:
+        from cdifflib import CSequenceMatcher as SequenceMatcher
+    except ImportError:
+        from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz.distance import Levenshtein
+except ImportError:
+    Levenshtein = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# AI 回應可能包在 markdown code fence 中
+_FENCE_HEAD_RE = re.compile(r'^```\n?')
+_FENCE_TAIL_RE = re.compile(r'\n?```$')
+# 逐字稿清洗（_sanitize_script）
+# 單字元規則合併為一次 str.translate：刪除引號/括號/書名號，頓號、分號 → 逗號，冒號 → 空格
+_SANITIZE_TABLE = str.maketrans({
+    **dict.fromkeys('「」""()《》'),
+    '、': '，',
+    '；': '，',
+    '：': ' ',
+})
+_DASH_ELLIPSIS_RE = re.compile(r'——|……|\.{3,}')
+# 中英文交界（英文/數字 ↔ 中文）與連續空格都替換為單一空格，一次掃描完成：
+# 交界以零寬的前後查找比對，插入的空格不會與既有空格相鄰，因此可與空格合併放在同一個 pattern
+_SPACING_RE = re.compile(
+    r'(?<=[a-zA-Z0-9])(?=[^\x00-\x7F\s])'
+    r'|(?<=[^\x00-\x7F])(?=[a-zA-Z0-9])'
+    r'| {2,}'
+)
+# Step 3 分塊時，過長段落在句尾切開
+_SENTENCE_END_RE = re.compile(r'(?<=[。！？])')
+# SRT 每行結尾不顯示的標點
+_TRAILING_PUNCT_RE = re.compile(r'[，。、；：,.]+$')
+
+
+def _run_async(coro):
+    """
+    在同步流程中執行 coroutine
+    
+    API 背景任務會在已運行的 event loop 中呼叫同步的 generate()，
+    此時無法直接 asyncio.run，改交給獨立執行緒執行。
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+@dataclass
+class AlignedChars:
+    """
+    Force Alignment 結果（Struct of Arrays）
+    
+    第 i 個字元 chars[i] 的時間區間為 starts[i] ~ ends[i]（秒）。
+    """
+    chars: str
+    starts: np.ndarray
+    ends: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.chars)
+    
+    def to_list(self) -> list:
+        """轉回 [{"char", "start", "end"}, ...] 格式（供除錯 JSON 輸出）"""
+        return [
+            {"char": char, "start": start, "end": end}
+            for char, start, end in zip(self.chars, self.starts.tolist(), self.ends.tolist())
+        ]
+
+
+def _matcher_opcodes(a: str, b: str) -> list:
+    """
+    依 AlignmentConfig.MATCHER 選擇比對器計算 opcodes
+    
+    levenshtein 以最小編輯距離對齊（rapidfuzz 的 C++ bit-parallel 實作、記憶體線性），
+    較符合 ASR 錯字的直覺；未安裝 rapidfuzz 時退回 SequenceMatcher。
+    dtw 使用 alignment_engine 的 Numba DTW 核心，未安裝 Numba 或所需帶寬過大時同樣退回 SequenceMatcher。
+    """
+    if AlignmentConfig.MATCHER == "levenshtein" and Levenshtein is not None:
+        return Levenshtein.opcodes(a, b).as_list()
+    if AlignmentConfig.MATCHER == "dtw" and alignment_engine.NUMBA_AVAILABLE:
+        opcodes = alignment_engine.dtw_opcodes(a, b)
+        if opcodes is not None:
+            return opcodes
+    return SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+
+
+def _diff_opcodes(a: str, b: str) -> list:
+    """
+    計算 a → b 的 opcodes（格式同 SequenceMatcher.get_opcodes）
+    
+    Whisper 與逐字稿通常有很長的相同開頭與結尾，先剝除共同前綴/後綴，
+    只對中間不同的區段執行比對器，再把索引位移回原字串。
+    兩者完全相同時中間為空，不會呼叫比對器。
+    """
+    prefix = len(os.path.commonprefix([a, b]))
+    suffix = len(os.path.commonprefix([a[prefix:][::-1], b[prefix:][::-1]]))
+    a_end = len(a) - suffix
+    b_end = len(b) - suffix
+    
+    opcodes = []
+    if prefix:
+        opcodes.append(('equal', 0, prefix, 0, prefix))
+    
+    if prefix < a_end or prefix < b_end:
+        for tag, i1, i2, j1, j2 in _matcher_opcodes(a[prefix:a_end], b[prefix:b_end]):
+            opcodes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+    
+    if suffix:
+        opcodes.append(('equal', a_end, len(a), b_end, len(b)))
+    return opcodes
+
+
+# 段落切點校正：估計位置前後各取多少 Whisper 字元、段落邊界前後各取多少逐字稿字元做局部比對
+_CUT_SEARCH_RADIUS = 200
+_CUT_CONTEXT_CHARS = 20
+
+
+def _locate_cut(whisper_str: str, script_str: str, boundary: int, estimate: int, lower: int) -> int:
+    """
+    找出逐字稿位置 boundary 在 Whisper 字串中的對應位置
+    
+    取估計位置附近的 Whisper 片段，與 boundary 前後的逐字稿片段做局部比對，
+    以最接近 boundary 的相同區塊換算位置；完全沒有相同字元時退回估計位置。
+    """
+    w_start = max(lower, estimate - _CUT_SEARCH_RADIUS)
+    w_end = min(len(whisper_str), estimate + _CUT_SEARCH_RADIUS)
+    s_start = max(0, boundary - _CUT_CONTEXT_CHARS)
+    s_end = min(len(script_str), boundary + _CUT_CONTEXT_CHARS)
+    target = boundary - s_start
+    
+    matcher = SequenceMatcher(None, whisper_str[w_start:w_end], script_str[s_start:s_end], autojunk=False)
+    cut = estimate
+    best_distance = None
+    for a, b, size in matcher.get_matching_blocks():
+        if not size:
+            continue
+        if target < b:
+            candidate, distance = a, b - target
+        elif target > b + size:
+            candidate, distance = a + size, target - b - size
+        else:
+            candidate, distance = a + target - b, 0
+        if best_distance is None or distance < best_distance:
+            cut = w_start + candidate
+            best_distance = distance
+    return cut
+
+
+def _paragraph_opcodes(whisper_str: str, paragraphs: list) -> list:
+    """
+    逐段計算 Whisper → 逐字稿的 opcodes（索引對應整串 whisper_str 與 "".join(paragraphs)）
+    
+    SequenceMatcher 的成本隨長度平方成長，整篇一起比對最耗時。
+    Whisper 沒有段落資訊，依剩餘長度比例估計每個段落邊界在 Whisper 中的位置，
+    再以 _locate_cut 局部校正，之後各段落獨立比對，總成本降為各段平方和。
+    使用 DTW 核心時（釋放 GIL）各段落分配到多個執行緒並行比對。
+    """
+    script_str = "".join(paragraphs)
+    if len(paragraphs) <= 1 or not whisper_str or whisper_str == script_str:
+        return _diff_opcodes(whisper_str, script_str)
+    
+    # 先依序決定每個段落對應的 Whisper 區段
+    segments = []
+    w_pos = 0
+    s_pos = 0
+    for k, paragraph in enumerate(paragraphs):
+        s_end = s_pos + len(paragraph)
+        if k == len(paragraphs) - 1:
+            w_end = len(whisper_str)
+        else:
+            ratio = (len(whisper_str) - w_pos) / (len(script_str) - s_pos)
+            estimate = min(w_pos + round(len(paragraph) * ratio), len(whisper_str))
+            w_end = max(w_pos, _locate_cut(whisper_str, script_str, s_end, estimate, w_pos))
+        segments.append((w_pos, w_end, s_pos, paragraph))
+        w_pos = w_end
+        s_pos = s_end
+    
+    def diff_segment(segment):
+        w_start, w_end, s_start, paragraph = segment
+        return [
+            (tag, i1 + w_start, i2 + w_start, j1 + s_start, j2 + s_start)
+            for tag, i1, i2, j1, j2 in _diff_opcodes(whisper_str[w_start:w_end], paragraph)
+        ]
+    
+    if AlignmentConfig.MATCHER == "dtw" and alignment_engine.NUMBA_AVAILABLE:
+        with ThreadPoolExecutor(max_workers=ProcessingConfig.MAX_WORKERS) as executor:
+            results = list(executor.map(diff_segment, segments))
+    else:
+        results = map(diff_segment, segments)
+    return [opcode for segment_opcodes in results for opcode in segment_opcodes]
+
+
+def _cache_key(*parts) -> str:
+    """將多個部分（字串或 bytes）雜湊成快取鍵（blake2b，32 字元十六進位）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _load_cache(path: Path):
+    """讀取 JSON 快取；不存在或內容損毀時回傳 None（損毀的檔案一併刪除）"""
+    try:
+        payload = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        # orjson.JSONDecodeError 是 json.JSONDecodeError 的子類別
+        return orjson.loads(payload) if orjson is not None else json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        print(f"   ⚠️  快取檔損毀，重新計算：{path}")
+        path.unlink(missing_ok=True)
+        return None
+
+
+def _save_cache(path: Path, data):
+    """
+    寫入 JSON 快取（不縮排）
+    
+    先寫到同目錄的暫存檔再 os.replace，中途被中斷或多個行程同時寫入時，
+    讀取端只會看到完整的舊檔或新檔。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if orjson is not None:
+        payload = orjson.dumps(data)
+    else:
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """載入 tiktoken 編碼；未安裝或編碼檔下載失敗時回傳 None"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def _count_tokens(text: str) -> int:
+    """
+    估算文字的 token 數
+    
+    使用 tiktoken 的 cl100k_base 編碼估算（Claude 沒有公開 tokenizer，僅作為切塊依據）；
+    無法使用 tiktoken 時以字元數估算（中文約 1 字 1 token，偏保守）。
+    """
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return len(text)
+    return len(encoding.encode(text))
+
 
 class SubtitleService:
     """
@@ -27,9 +319,23 @@ class SubtitleService:
     5. 時間戳對齊產生 SRT
     """
     
+    # Step 3 分塊設定：逐字稿超過門檻時，依段落（過長段落再依句尾）切成多塊並行送出；
+    # 斷句的耗時與輸出長度成正比，每塊約 500 字能讓長逐字稿的 Step 3 不再卡住整條流程
+    SEGMENT_TOKEN_THRESHOLD = 1000
+    SEGMENT_CHUNK_TOKENS = 600
+    # 同時送出的區塊上限，避免長逐字稿一次發出數十個請求觸發 OpenRouter 限流（429）
+    SEGMENT_MAX_CONCURRENCY = 4
+    
+    # Step 4 跳過空格和標點，不參與匹配（修復 AI 新增標點導致的偏移累積）
+    _SKIP_CHARS = frozenset({
+        ' ', '，', '。', '、', '！', '？', '：', '；', '「', '」', '『', '』', '（', '）',
+        ',', '.', '!', '?', ':', ';',
+    })
+    # str.translate 刪除表：一次 C 層級掃描濾掉所有跳過字元
+    _SKIP_TABLE = dict.fromkeys(map(ord, _SKIP_CHARS))
+    
     # 檔案命名約定
     AVATAR_FILENAME = "avatar_full.mp4"
-    EXTRACTED_AUDIO_FILENAME = "_extracted_audio.mp3"
     SCRIPT_FILENAME = "full_script.txt"
     SUBTITLE_FILENAME = "full_subtitle.srt"
     
@@ -96,17 +402,25 @@ Oracle 甲骨文這家讓人又愛又恨的軟體巨頭
 - 嚴禁輸出任何解釋、編號、原文字數統計或 markdown 標記。"""
     
     def __init__(self):
-        self.openai_client = get_openai_client()
+        # 語音辨識後端：預設 OpenAI Whisper API，可切換為本機 faster-whisper
+        if WhisperConfig.BACKEND == "faster-whisper":
+            self.whisper_client = get_faster_whisper_client()
+        else:
+            self.whisper_client = get_openai_client()
         self.openrouter_client = get_openrouter_client()
         self.cc = OpenCC('s2t')
+        # 簡轉繁結果快取：Whisper 的詞彙高度重複（的、是、在…），同一詞只需轉換一次
+        self._cc_cache = {}
     
-    def generate(self, folder_path: Path, debug: bool = True) -> Path:
+    def generate(self, folder_path: Path, debug: bool = True, use_cache: bool = True) -> Path:
         """
         生成字幕的主入口
         
         Args:
             folder_path: 素材資料夾路徑
             debug: 是否儲存中間結果供除錯
+            use_cache: 是否快取 Whisper 結果（相同音訊重跑時略過 API 呼叫）；
+                       AI 斷句結果另需 CacheConfig.CACHE_SEGMENTS 開啟才會快取
             
         Returns:
             生成的 SRT 檔案路徑
@@ -117,7 +431,6 @@ Oracle 甲骨文這家讓人又愛又恨的軟體巨頭
         avatar_path = folder_path / self.AVATAR_FILENAME
         script_path = folder_path / self.SCRIPT_FILENAME
         output_path = folder_path / self.SUBTITLE_FILENAME
-        extracted_audio_path = folder_path / self.EXTRACTED_AUDIO_FILENAME
         
         # 驗證必要檔案
         self._validate_files(avatar_path, script_path)
@@ -128,57 +441,69 @@ Oracle 甲骨文這家讓人又愛又恨的軟體巨頭
         print("============================================================")
         print(f"📁 工作目錄：{folder_path}")
         
+        # 載入逐字稿
+        full_script = self._load_script(script_path)
+        print(f"📝 原始逐字稿長度：{len(full_script)} 字")
+        
+        # Step 0.5: 符號清洗（確保 Step 2 和 Step 3 使用一致的文字）
+        sanitized_script = self._sanitize_script(full_script)
+        print(f"🧹 清洗後逐字稿長度：{len(sanitized_script)} 字")
+        
+        # 除錯檔在背景執行緒寫入，不佔用主流程時間；結束前（含流程失敗時）等待已送出的寫入完成
+        debug_pool = ThreadPoolExecutor(max_workers=2) if debug else None
+        debug_writes = []
+        debug_savers = {
+            "whisper": lambda data: self._save_debug_json(folder_path / "_debug_step1_whisper.json", data),
+            "alignment": lambda data: self._save_debug_json(
+                folder_path / "_debug_step2_alignment.json", data.to_list()
+            ),
+            "segments": lambda data: self._save_debug_text(folder_path / "_debug_step3_ai_segments.txt", data),
+        }
+        
+        def save_debug(step: str, data):
+            """各步驟一完成就送出除錯檔寫入，後續步驟失敗時仍能保留前面的結果"""
+            debug_writes.append(debug_pool.submit(debug_savers[step], data))
+        
         try:
-            # Step 0: 從 Avatar 影片提取音軌
-            self._extract_audio(avatar_path, extracted_audio_path)
-            
-            # 載入逐字稿
-            full_script = self._load_script(script_path)
-            print(f"📝 原始逐字稿長度：{len(full_script)} 字")
-            
-            # Step 0.5: 符號清洗（確保 Step 2 和 Step 3 使用一致的文字）
-            sanitized_script = self._sanitize_script(full_script)
-            print(f"🧹 清洗後逐字稿長度：{len(sanitized_script)} 字")
-            
-            if debug:
-                self._save_debug_text(folder_path / "_debug_sanitized_script.txt", [sanitized_script])
-            
-            # Step 1: Whisper 語音辨識
-            whisper_timestamps = self._step1_transcribe_whisper(extracted_audio_path)
-            
-            if debug:
-                self._save_debug_json(folder_path / "_debug_step1_whisper.json", whisper_timestamps)
-            
-            # Step 2: Force Alignment（使用清洗後的逐字稿）
-            aligned_chars = self._step2_force_alignment(whisper_timestamps, sanitized_script)
-            
             if debug:
-                self._save_debug_json(folder_path / "_debug_step2_alignment.json", aligned_chars)
+                debug_writes.append(debug_pool.submit(
+                    self._save_debug_text, folder_path / "_debug_sanitized_script.txt", [sanitized_script]
+                ))
             
-            # Step 3: Claude 文字切分（使用清洗後的逐字稿）
-            subtitle_lines = self._step3_segment_text(sanitized_script)
-            
-            if debug:
-                self._save_debug_text(folder_path / "_debug_step3_ai_segments.txt", subtitle_lines)
+            # Step 0 → 1 → 2 依序執行，Step 3（Claude 斷句）只依賴逐字稿，同時在背景進行
+            whisper_timestamps, aligned_chars, subtitle_lines = _run_async(
+                self._run_pipeline(
+                    avatar_path,
+                    sanitized_script,
+                    CacheConfig.CACHE_DIR if use_cache else None,
+                    on_step=save_debug if debug else None
+                )
+            )
             
             # Step 4: 時間戳對齊
             final_subtitles = self._step4_align_timestamps(subtitle_lines, aligned_chars)
             
             # 儲存 SRT
             self._save_srt(final_subtitles, output_path)
-            
-            print("============================================================")
-            
-            return output_path
-            
         finally:
-            # 清理暫存的提取音檔
-            if extracted_audio_path.exists():
-                extracted_audio_path.unlink()
-                print("   🗑️  已清理暫存音檔")
+            if debug_pool is not None:
+                debug_pool.shutdown(wait=True)
+        
+        # 除錯檔寫入失敗時在此拋出
+        for future in debug_writes:
+            future.result()
+        
+        print("============================================================")
+        
+        return output_path
     
     def _validate_files(self, avatar_path: Path, script_path: Path):
-        """驗證必要檔案存在"""
+        """
+        驗證必要檔案存在
+        
+        使用 Path.exists() 而非比對目錄列表：macOS / Windows 的檔案系統不分大小寫，
+        ffmpeg 能開啟的 Avatar_full.mp4 也應通過檢查。
+        """
         if not avatar_path.exists():
             raise FileNotFoundError(f"找不到 Avatar 影片：{avatar_path}")
         if not script_path.exists():
@@ -186,61 +511,80 @@ Oracle 甲骨文這家讓人又愛又恨的軟體巨頭
     
     # Whisper API 檔案大小上限 (25MB)
     WHISPER_MAX_SIZE = 25 * 1024 * 1024
+    
+    # 提取音軌格式：Whisper 內部以 16kHz 單聲道處理，直接輸出同規格的 Opus，
+    # 編碼成本遠低於 MP3 VBR，24kbps 約 11MB/小時
+    AUDIO_SAMPLE_RATE = 16000
+    AUDIO_BITRATE = 24000
+    # 超過 25MB 時重新壓縮的最低位元率（Opus 語音在 8kbps 仍可辨識）
+    AUDIO_MIN_BITRATE = 8000
+    # 上傳 Whisper 時使用的檔名（API 依副檔名判斷格式）
+    AUDIO_UPLOAD_FILENAME = "audio.ogg"
 
-    def _extract_audio(self, video_path: Path, output_path: Path) -> Path:
-        """從 Avatar 影片提取音軌（自動壓縮至 Whisper 25MB 上限內）"""
+    def _extract_audio(self, video_path: Path) -> bytes:
+        """
+        從 Avatar 影片提取音軌（自動壓縮至 Whisper 25MB 上限內）
+        
+        ffmpeg 直接輸出到 stdout，音訊只存在記憶體中，不寫暫存檔。
+        """
         print("\n🔊 從 Avatar 影片提取音軌...")
 
-        result = subprocess.run([
-            'ffmpeg', '-y',
-            '-i', str(video_path),
-            '-vn',
-            '-acodec', 'libmp3lame',
-            '-q:a', '2',
-            str(output_path)
-        ], capture_output=True, text=True)
-
-        if result.returncode != 0:
-            print(f"⚠️  FFmpeg 警告：{result.stderr[-500:] if result.stderr else 'unknown'}")
+        audio = self._encode_audio(video_path, self.AUDIO_BITRATE)
 
-        # 檢查檔案大小，超過 Whisper 上限則用最佳位元率重新編碼
-        if output_path.exists() and output_path.stat().st_size > self.WHISPER_MAX_SIZE:
-            size_mb = output_path.stat().st_size / (1024 * 1024)
+        # 檢查大小，超過 Whisper 上限則用最佳位元率重新編碼
+        if len(audio) > self.WHISPER_MAX_SIZE:
+            size_mb = len(audio) / (1024 * 1024)
             print(f"   ⚠️  音檔 {size_mb:.1f}MB 超過 Whisper 25MB 上限，正在壓縮...")
 
-            temp_path = output_path.with_suffix('.tmp.mp3')
-            output_path.rename(temp_path)
-
-            # 取得音檔時長，計算能塞進 24MB 的最大位元率（留 1MB 餘量）
+            # 取得影片時長，計算能塞進 24MB 的最大位元率（留 1MB 餘量）
             probe = subprocess.run([
                 'ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1', str(temp_path)
+                '-of', 'default=noprint_wrappers=1:nokey=1', str(video_path)
             ], capture_output=True, text=True)
             duration = float(probe.stdout.strip()) if probe.returncode == 0 else 1800.0
             target_bitrate = int((24 * 1024 * 1024 * 8) / duration)
             # 限制在合理範圍內
-            target_bitrate = max(48000, min(target_bitrate, 128000))
+            target_bitrate = max(self.AUDIO_MIN_BITRATE, min(target_bitrate, self.AUDIO_BITRATE))
             print(f"   📊 音檔時長 {duration:.0f}s，目標位元率 {target_bitrate // 1000}kbps")
 
-            result = subprocess.run([
-                'ffmpeg', '-y',
-                '-i', str(temp_path),
-                '-acodec', 'libmp3lame',
-                '-b:a', str(target_bitrate),
-                '-ac', '1',
-                str(output_path)
-            ], capture_output=True, text=True)
+            audio = self._encode_audio(video_path, target_bitrate)
 
-            temp_path.unlink(missing_ok=True)
+            new_size_mb = len(audio) / (1024 * 1024)
+            print(f"   ✅ 壓縮完成：{new_size_mb:.1f}MB")
 
-            if result.returncode != 0:
-                raise RuntimeError(f"音檔壓縮失敗：{result.stderr[-500:] if result.stderr else 'unknown'}")
+        print(f"   ✅ 音軌提取完成（{len(audio) / (1024 * 1024):.1f}MB）")
+        return audio
 
-            new_size_mb = output_path.stat().st_size / (1024 * 1024)
-            print(f"   ✅ 壓縮完成：{new_size_mb:.1f}MB")
+    def _encode_audio(self, video_path: Path, bitrate: int) -> bytes:
+        """
+        以 ffmpeg 將影片音軌編碼為 16kHz 單聲道 Opus（Ogg 容器），回傳 stdout 的內容
+        
+        Ogg 封裝預設每次使用隨機的串流序號（寫入每個 page 標頭與 CRC），
+        加上 bitexact 旗標讓同一支影片每次輸出相同的 bytes，Whisper 快取鍵才會穩定。
+        """
+        # 只輸出警告與錯誤（不含版本資訊與逐秒進度），長影片的 stderr 也只有幾行
+        result = subprocess.run([
+            'ffmpeg', '-y',
+            '-hide_banner', '-nostats', '-loglevel', 'warning',
+            '-i', str(video_path),
+            '-vn',
+            '-ac', '1',
+            '-ar', str(self.AUDIO_SAMPLE_RATE),
+            '-c:a', 'libopus',
+            '-b:a', str(bitrate),
+            '-fflags', '+bitexact',
+            '-flags:a', '+bitexact',
+            '-f', 'ogg',
+            'pipe:1'
+        ], capture_output=True)
 
-        print(f"   ✅ 音軌提取完成：{output_path}")
-        return output_path
+        if result.returncode != 0:
+            stderr = result.stderr.decode("utf-8", errors="replace")[-500:] if result.stderr else 'unknown'
+            if not result.stdout:
+                raise RuntimeError(f"音軌提取失敗：{stderr}")
+            print(f"⚠️  FFmpeg 警告：{stderr}")
+
+        return result.stdout
     
     def _load_script(self, script_path: Path) -> str:
         """讀取並標準化逐字稿"""
@@ -260,143 +604,286 @@ Oracle 甲骨文這家讓人又愛又恨的軟體巨頭
         4. 刪除：破折號——、省略號……
         5. 中英文間加空格
         """
-        # 1. 刪除引號、括號、書名號
-        text = re.sub(r'[「」""()《》]', '', text)
+        # 1~3. 刪除引號、括號、書名號；頓號、分號 → 逗號；冒號 → 空格
+        text = text.translate(_SANITIZE_TABLE)
         
-        # 2. 頓號、分號 → 逗號
-        text = text.replace('、', '，').replace('；', '，')
+        # 4. 刪除破折號、省略號
+        text = _DASH_ELLIPSIS_RE.sub('', text)
         
-        # 3. 冒號 → 空格
-        text = text.replace('：', ' ')
+        # 5. 中英文間加空格（英文/數字 ↔ 中文），同時清理多餘空格
+        text = _SPACING_RE.sub(' ', text)
         
-        # 4. 刪除破折號、省略號
-        text = re.sub(r'——|……|\.{3,}', '', text)
+        return text
+    
+    async def _run_pipeline(
+        self, avatar_path: Path, transcript: str, cache_dir: Path = None, on_step=None
+    ) -> tuple:
+        """
+        Step 0 ~ Step 3 的並行排程
         
-        # 5. 中英文間加空格（英文/數字 ↔ 中文）
-        text = re.sub(r'([a-zA-Z0-9])([^\x00-\x7F\s])', r'\1 \2', text)
-        text = re.sub(r'([^\x00-\x7F])([a-zA-Z0-9])', r'\1 \2', text)
+        Step 3 先在背景送出，同時依序執行 Step 0 音軌提取 → Step 1 Whisper → Step 2 Force Alignment。
+        ffmpeg 與比對屬於阻塞工作，交給執行緒執行，讓 event loop 能持續處理 Step 3 的回應。
+        cache_dir 不為 None 時，Step 1 與 Step 3 的結果會快取在該目錄。
+        on_step 不為 None 時，每個步驟完成就以 on_step("whisper" / "alignment" / "segments", 結果) 通知，
+        供呼叫端立即寫出除錯檔。
         
-        # 清理多餘空格
-        text = re.sub(r' +', ' ', text)
+        Returns:
+            (whisper_timestamps, aligned_chars, subtitle_lines)
+        """
+        def notify(step: str, result):
+            if on_step is not None:
+                on_step(step, result)
         
-        return text
+        async def segment() -> list:
+            subtitle_lines = await self._segment_with_cache(transcript, cache_dir)
+            notify("segments", subtitle_lines)
+            return subtitle_lines
+        
+        segment_task = asyncio.create_task(segment())
+        try:
+            whisper_timestamps = await self._transcribe_with_cache(avatar_path, cache_dir)
+            notify("whisper", whisper_timestamps)
+            aligned_chars = await asyncio.to_thread(
+                self._step2_force_alignment, whisper_timestamps, transcript
+            )
+            notify("alignment", aligned_chars)
+        except BaseException:
+            segment_task.cancel()
+            raise
+        
+        subtitle_lines = await segment_task
+        return whisper_timestamps, aligned_chars, subtitle_lines
+    
+    async def _transcribe_with_cache(self, avatar_path: Path, cache_dir: Path = None) -> list:
+        """
+        Step 0 + Step 1：提取音軌並語音辨識
+        
+        快取鍵為音訊內容與辨識後端（本機後端另含模型與精度）：同一支影片即使重新下載到不同資料夾也能命中，
+        命中時只需提取音軌（數秒），不呼叫 Whisper。
+        """
+        audio = await asyncio.to_thread(self._extract_audio, avatar_path)
+        
+        cache_path = None
+        if cache_dir is not None:
+            backend = [WhisperConfig.BACKEND]
+            if WhisperConfig.BACKEND == "faster-whisper":
+                # 本機模型的大小與精度都會影響辨識結果
+                backend += [WhisperConfig.LOCAL_MODEL, WhisperConfig.LOCAL_COMPUTE_TYPE]
+            key = _cache_key(*backend, audio)
+            cache_path = cache_dir / "whisper" / f"{key}.json"
+            cached = _load_cache(cache_path)
+            if cached is not None:
+                print(f"♻️  使用快取的 Whisper 結果：{cache_path}")
+                return cached
+        
+        whisper_timestamps = await self._step1_transcribe_whisper(audio)
+        
+        if cache_path is not None:
+            _save_cache(cache_path, whisper_timestamps)
+        return whisper_timestamps
+    
+    async def _segment_with_cache(self, transcript: str, cache_dir: Path = None) -> list:
+        """
+        Step 3：AI 文字切分
+        
+        快取鍵為提示詞、模型與逐字稿，任一變動都會重新切分。
+        模型溫度不為 0，快取會固定沿用第一次的斷句結果，因此只在 CacheConfig.CACHE_SEGMENTS 開啟時使用。
+        """
+        cache_path = None
+        if cache_dir is not None and CacheConfig.CACHE_SEGMENTS:
+            key = _cache_key(self.SEGMENTATION_PROMPT, self.openrouter_client.DEFAULT_MODEL, transcript)
+            cache_path = cache_dir / "segments" / f"{key}.json"
+            cached = _load_cache(cache_path)
+            if cached is not None:
+                print(f"♻️  使用快取的 AI 斷句結果：{cache_path}")
+                return cached
+        
+        subtitle_lines = await self._step3_segment_text(transcript)
+        
+        if cache_path is not None:
+            _save_cache(cache_path, subtitle_lines)
+        return subtitle_lines
     
-    def _step1_transcribe_whisper(self, audio_path: Path) -> list:
-        """Step 1: Whisper 語音辨識"""
-        print("🚀 開始 Step 1: Whisper API 語音辨識...")
-        print("   正在上傳音訊至 OpenAI...")
+    async def _step1_transcribe_whisper(self, audio: bytes) -> list:
+        """Step 1: Whisper 語音辨識（audio 為 _extract_audio 輸出的 Ogg/Opus 內容）"""
+        if WhisperConfig.BACKEND == "faster-whisper":
+            print("🚀 開始 Step 1: faster-whisper 本機語音辨識...")
+        else:
+            print("🚀 開始 Step 1: Whisper API 語音辨識...")
+            print("   正在上傳音訊至 OpenAI...")
         
-        response = self.openai_client.transcribe_audio(audio_path)
+        response = await self.whisper_client.transcribe_audio_async(
+            (self.AUDIO_UPLOAD_FILENAME, audio)
+        )
         
         print(f"   API 回傳成功 (Duration: {response.duration:.2f}s)")
         
         word_timestamps = []
         if hasattr(response, 'words'):
-            for word_obj in response.words:
-                word_timestamps.append({
-                    "word": self.cc.convert(word_obj.word.strip()),
-                    "start": word_obj.start,
-                    "end": word_obj.end
-                })
+            words = self._convert_words([word_obj.word.strip() for word_obj in response.words])
+            word_timestamps = [
+                {"word": word, "start": word_obj.start, "end": word_obj.end}
+                for word, word_obj in zip(words, response.words)
+            ]
         else:
             print("   ⚠️  警告：API 未回傳詳細字級時間戳")
         
         print(f"   ✅ 取得 {len(word_timestamps)} 個字級時間戳")
         return word_timestamps
     
-    def _step2_force_alignment(self, whisper_timestamps: list, full_script: str) -> list:
+    def _convert_words(self, words: list) -> list:
+        """
+        將 Whisper 的詞批次簡轉繁
+        
+        快取中沒有的詞以 \x1f（ASCII Unit Separator，OpenCC 不會轉換）串接後一次轉換再切回，
+        切回的數量不符時退回逐詞轉換。
+        """
+        cache = self._cc_cache
+        pending = [word for word in dict.fromkeys(words) if word not in cache]
+        if pending:
+            converted = self.cc.convert("\x1f".join(pending)).split("\x1f")
+            if len(converted) != len(pending):
+                converted = [self.cc.convert(word) for word in pending]
+            cache.update(zip(pending, converted))
+        return [cache[word] for word in words]
+    
+    def _step2_force_alignment(self, whisper_timestamps: list, full_script: str) -> AlignedChars:
         """Step 2: Force Alignment (DTW 對齊)"""
         print("🔧 Step 2: 執行 Force Alignment (時間戳對齊)...")
         
-        # 準備 Whisper 的字元列表
-        whisper_chars = []
-        for w in whisper_timestamps:
-            for char in w["word"]:
-                whisper_chars.append({"char": char, "start": w["start"], "end": w["end"]})
+        # 準備 Whisper 的字元序列（SoA：字串 + 起訖時間陣列，每個字沿用所屬 word 的時間）
+        num_words = len(whisper_timestamps)
+        words = [w["word"] for w in whisper_timestamps]
+        word_lengths = np.fromiter(map(len, words), dtype=np.intp, count=num_words)
+        word_starts = np.fromiter((w["start"] for w in whisper_timestamps), dtype=np.float64, count=num_words)
+        word_ends = np.fromiter((w["end"] for w in whisper_timestamps), dtype=np.float64, count=num_words)
         
-        # 準備 Script 的字元列表
-        script_chars = list(full_script.replace("\n", ""))
+        whisper_str = "".join(words)
+        whisper_starts = np.repeat(word_starts, word_lengths)
+        whisper_ends = np.repeat(word_ends, word_lengths)
         
-        whisper_str = "".join([x["char"] for x in whisper_chars])
-        script_str = "".join(script_chars)
+        # Script 的字元序列；對齊結果的字元即為 script_str，只需填入每個字的時間
+        paragraphs = [paragraph for paragraph in full_script.split("\n") if paragraph]
+        script_str = "".join(paragraphs)
+        aligned_starts = np.empty(len(script_str), dtype=np.float64)
+        aligned_ends = np.empty(len(script_str), dtype=np.float64)
         
-        # 使用 difflib 進行序列比對
-        matcher = difflib.SequenceMatcher(None, whisper_str, script_str, autojunk=False)
+        # 進行序列比對（逐段落比對，縮小每次 SequenceMatcher 的規模）
+        opcodes = _paragraph_opcodes(whisper_str, paragraphs)
         
-        aligned_results = []
         current_time = 0.0
-        if whisper_chars:
-            current_time = whisper_chars[0]["start"]
+        if whisper_str:
+            current_time = whisper_starts[0]
         
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        for op_idx, (tag, i1, i2, j1, j2) in enumerate(opcodes):
             if tag == 'equal':
-                for k in range(j2 - j1):
-                    w_char = whisper_chars[i1 + k]
-                    aligned_results.append({
-                        "char": script_str[j1 + k],
-                        "start": w_char["start"],
-                        "end": w_char["end"]
-                    })
-                    current_time = w_char["end"]
+                aligned_starts[j1:j2] = whisper_starts[i1:i2]
+                aligned_ends[j1:j2] = whisper_ends[i1:i2]
+                current_time = whisper_ends[i2-1]
                     
             elif tag == 'replace':
                 if i2 > i1:
-                    start_t = whisper_chars[i1]["start"]
-                    end_t = whisper_chars[i2-1]["end"]
+                    start_t = whisper_starts[i1]
+                    end_t = whisper_ends[i2-1]
                 else:
                     start_t = current_time
                     end_t = current_time
-                    
-                duration = end_t - start_t
-                num_script_chars = j2 - j1
                 
+                # 將 Whisper 錯字區段的時間平均分給 Script 的字
+                num_script_chars = j2 - j1
                 if num_script_chars > 0:
-                    char_duration = duration / num_script_chars
-                    for k in range(num_script_chars):
-                        aligned_results.append({
-                            "char": script_str[j1 + k],
-                            "start": start_t + (k * char_duration),
-                            "end": start_t + ((k + 1) * char_duration)
-                        })
+                    bounds = np.linspace(start_t, end_t, num_script_chars + 1)
+                    aligned_starts[j1:j2] = bounds[:-1]
+                    aligned_ends[j1:j2] = bounds[1:]
                 current_time = end_t
                 
             elif tag == 'delete':
                 if i2 > i1:
-                    current_time = whisper_chars[i2-1]["end"]
+                    current_time = whisper_ends[i2-1]
                 
             elif tag == 'insert':
                 # Whisper 漏掉的字（但 Script 有）：執行 Look-ahead 插值
                 # 1. 向後尋找下一個已知時間戳
                 next_time = current_time
-                remaining_ops = matcher.get_opcodes()[matcher.get_opcodes().index((tag, i1, i2, j1, j2)) + 1:]
                 
-                for next_tag, ni1, ni2, nj1, nj2 in remaining_ops:
+                for next_tag, ni1, ni2, nj1, nj2 in opcodes[op_idx + 1:]:
                     # 只要下一個操作有用到 Whisper 的字元，就能取得時間
-                    if next_tag in ('equal', 'replace', 'delete') and ni1 < len(whisper_chars):
-                        next_time = whisper_chars[ni1]["start"]
+                    if next_tag in ('equal', 'replace', 'delete') and ni1 < len(whisper_str):
+                        next_time = whisper_starts[ni1]
                         break
                 
-                # 2. 計算時間間隙與分攤
-                gap_duration = next_time - current_time
-                num_chars = j2 - j1
-                
+                # 2. 將時間間隙平均分攤給漏掉的字
                 # 若 gap 太大（例如 > 10秒），可能造成字幕顯示過久，但仍比疊在一起好
-                char_duration = gap_duration / num_chars if num_chars > 0 else 0
-                
-                for k in range(num_chars):
-                    aligned_results.append({
-                        "char": script_str[j1 + k],
-                        "start": current_time + (k * char_duration),
-                        "end": current_time + ((k + 1) * char_duration)
-                    })
-        
-        print(f"   ✅ Force Alignment 完成 (共 {len(aligned_results)} 個字元)")
-        return aligned_results
-    
-    def _step3_segment_text(self, transcript: str) -> list:
-        """Step 3: AI 文字切分"""
+                num_chars = j2 - j1
+                if num_chars > 0:
+                    bounds = np.linspace(current_time, next_time, num_chars + 1)
+                    aligned_starts[j1:j2] = bounds[:-1]
+                    aligned_ends[j1:j2] = bounds[1:]
+        
+        print(f"   ✅ Force Alignment 完成 (共 {len(script_str)} 個字元)")
+        return AlignedChars(script_str, aligned_starts, aligned_ends)
+    
+    async def _step3_segment_text(self, transcript: str) -> list:
+        """Step 3: AI 文字切分（長逐字稿依段落分塊並行切分）"""
         print("✂️  Step 3: AI 文字切分...")
         
+        chunks = self._split_transcript(transcript)
+        if len(chunks) > 1:
+            print(f"   📦 逐字稿較長，分為 {len(chunks)} 塊並行切分")
+        
+        semaphore = asyncio.Semaphore(self.SEGMENT_MAX_CONCURRENCY)
+        
+        async def segment(chunk: str) -> list:
+            async with semaphore:
+                return await self._segment_chunk(chunk)
+        
+        results = await asyncio.gather(*(segment(chunk) for chunk in chunks))
+        lines = [line for chunk_lines in results for line in chunk_lines]
+        
+        print(f"   ✅ 切分完成")
+        print(f"   📝 切分為 {len(lines)} 行")
+        return lines
+    
+    def _split_transcript(self, transcript: str) -> list:
+        """
+        將逐字稿切成不超過 SEGMENT_CHUNK_TOKENS 的區塊
+        
+        以段落為單位打包；單一段落過長時改在句尾（。！？）切開，單句仍過長則獨立成塊。
+        """
+        if _count_tokens(transcript) <= self.SEGMENT_TOKEN_THRESHOLD:
+            return [transcript]
+        
+        # (文字, 是否為段落開頭)
+        units = []
+        for paragraph in transcript.split("\n"):
+            if not paragraph.strip():
+                continue
+            if _count_tokens(paragraph) <= self.SEGMENT_CHUNK_TOKENS:
+                units.append((paragraph, True))
+            else:
+                sentences = [sentence for sentence in _SENTENCE_END_RE.split(paragraph) if sentence]
+                units.extend((sentence, k == 0) for k, sentence in enumerate(sentences))
+        
+        chunks = []
+        current = ""
+        current_tokens = 0
+        for text, starts_paragraph in units:
+            tokens = _count_tokens(text)
+            if current and current_tokens + tokens > self.SEGMENT_CHUNK_TOKENS:
+                chunks.append(current)
+                current = ""
+                current_tokens = 0
+            if current and starts_paragraph:
+                current += "\n"
+            current += text
+            current_tokens += tokens
+        
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    async def _segment_chunk(self, transcript: str) -> list:
+        """呼叫 AI 切分單一區塊，回傳字幕行"""
         user_prompt = f"""請根據原稿的段落結構，將以下文字切分成字幕段落：
 
 ## 原稿
@@ -404,84 +891,44 @@ Oracle 甲骨文這家讓人又愛又恨的軟體巨頭
 
 請輸出切分後的純文字（每行一段）。"""
         
-        result = self.openrouter_client.chat_completion(
+        result = await self.openrouter_client.chat_completion_async(
             system_prompt=self.SEGMENTATION_PROMPT,
             user_prompt=user_prompt
         )
         
         # 清理結果
-        result = re.sub(r'^```\n?', '', result)
-        result = re.sub(r'\n?```$', '', result)
+        result = _FENCE_HEAD_RE.sub('', result)
+        result = _FENCE_TAIL_RE.sub('', result)
         
-        lines = [line.strip() for line in result.strip().split('\n') if line.strip()]
-        
-        print(f"   ✅ 切分完成")
-        print(f"   📝 切分為 {len(lines)} 行")
-        return lines
+        # splitlines 同時處理 \r\n 與 \r，回傳的每行保證不含換行字元
+        return [line.strip() for line in result.splitlines() if line.strip()]
     
-    def _step4_align_timestamps(self, subtitle_lines: list, aligned_chars: list) -> list:
+    def _step4_align_timestamps(self, subtitle_lines: list, aligned_chars: AlignedChars) -> list:
         """Step 4: 時間戳對齊"""
         print("⏱️  Step 4: Python 字幕對齊...")
         
+        match_line = self._build_line_matcher(aligned_chars)
+        
         final_subtitles = []
         char_idx = 0
-        total_chars = len(aligned_chars)
         
         matched_count = 0
         fallback_count = 0
-        total_script_chars = sum(len(line.replace("\n", "").replace("\r", "")) for line in subtitle_lines)
+        # Step 3 輸出的每行已不含換行字元，直接加總長度
+        total_script_chars = sum(map(len, subtitle_lines))
         
-        current_time = aligned_chars[0]["start"] if aligned_chars else 0.0
+        current_time = float(aligned_chars.starts[0]) if len(aligned_chars) else 0.0
         
         for line in subtitle_lines:
-            line_clean = line.replace("\n", "").replace("\r", "")
-            if not line_clean:
+            if not line:
                 continue
-                
-            start_time = None
-            end_time = None
             
-            for char in line_clean:
-                # 跳過空格和標點，不參與匹配（修復 AI 新增標點導致的偏移累積）
-                skip_chars = {' ', '，', '。', '、', '！', '？', '：', '；', '「', '」', '『', '』', '（', '）', ',', '.', '!', '?', ':', ';'}
-                if char in skip_chars:
-                    continue
-                    
-                found = False
-                search_window = 100
-                
-                for k in range(min(search_window, total_chars - char_idx)):
-                    # 跳過 aligned_chars 中的空格和標點
-                    if aligned_chars[char_idx + k]["char"] in skip_chars:
-                        continue
-                    if aligned_chars[char_idx + k]["char"] == char:
-                        found_idx = char_idx + k
-                        item = aligned_chars[found_idx]
-                        
-                        if start_time is None:
-                            start_time = item["start"]
-                        
-                        end_time = item["end"]
-                        current_time = item["end"]
-                        char_idx = found_idx + 1
-                        found = True
-                        matched_count += 1
-                        break
-                
-                if not found:
-                    fallback_count += 1
-                    
-                    if char_idx < total_chars:
-                        item = aligned_chars[char_idx]
-                        if start_time is None:
-                            start_time = item["start"]
-                        end_time = item["end"]
-                        current_time = item["end"]
-                        char_idx += 1
-                    else:
-                        if start_time is None:
-                            start_time = current_time
-                        end_time = current_time
+            targets = line.translate(self._SKIP_TABLE)
+            start_time, end_time, char_idx, current_time, matched, fallback = match_line(
+                targets, char_idx, current_time
+            )
+            matched_count += matched
+            fallback_count += fallback
             
             if start_time is not None:
                 if end_time <= start_time:
@@ -507,32 +954,114 @@ Oracle 甲骨文這家讓人又愛又恨的軟體巨頭
         print("   ✅ 對齊完成")
         return final_subtitles
     
+    def _build_line_matcher(self, aligned_chars: AlignedChars):
+        """
+        建立 Step 4 的單行匹配函數
+        
+        match_line(targets, char_idx, current_time) 將一行字幕（已排除空格與標點）的字元，
+        依序在 aligned_chars[char_idx:char_idx + 100] 內尋找相同字元取得時間；找不到時使用 fallback 時間。
+        回傳 (start_time, end_time, char_idx, current_time, matched, fallback)，
+        該行沒有任何字元時 start_time 為 None。
+        
+        有 Numba 時使用 JIT 核心逐字比對 code point；否則以 str.find 在視窗內搜尋（C 層級掃描）。
+        """
+        search_window = 100
+        
+        if alignment_engine.NUMBA_AVAILABLE:
+            chars_cp = alignment_engine.to_codepoints(aligned_chars.chars)
+            starts_arr = np.ascontiguousarray(aligned_chars.starts, dtype=np.float64)
+            ends_arr = np.ascontiguousarray(aligned_chars.ends, dtype=np.float64)
+            
+            def match_line(targets: str, char_idx: int, current_time: float) -> tuple:
+                has_start, start_time, end_time, char_idx, current_time, matched, fallback = alignment_engine.match_line(
+                    chars_cp, starts_arr, ends_arr, alignment_engine.to_codepoints(targets),
+                    char_idx, current_time, search_window
+                )
+                return (start_time if has_start else None), end_time, char_idx, current_time, matched, fallback
+            
+            return match_line
+        
+        # 逐字存取純量時 Python list 比 ndarray 快，先轉換一次
+        chars = aligned_chars.chars
+        starts = aligned_chars.starts.tolist()
+        ends = aligned_chars.ends.tolist()
+        total_chars = len(aligned_chars)
+        
+        def match_line(targets: str, char_idx: int, current_time: float) -> tuple:
+            start_time = None
+            end_time = None
+            matched = 0
+            fallback = 0
+            
+            for pos, char in enumerate(targets):
+                if char_idx >= total_chars:
+                    # 已超出 aligned_chars：其餘字元全部沿用 current_time，不必逐字處理
+                    fallback += len(targets) - pos
+                    if start_time is None:
+                        start_time = current_time
+                    end_time = current_time
+                    break
+                
+                # 在 [char_idx, char_idx + search_window) 內找下一個相同字元
+                # （targets 已排除空格和標點，因此 aligned_chars 中的空格和標點自然不會命中）
+                found_idx = chars.find(char, char_idx, char_idx + search_window)
+                if found_idx >= 0:
+                    if start_time is None:
+                        start_time = starts[found_idx]
+                    
+                    end_time = ends[found_idx]
+                    current_time = ends[found_idx]
+                    char_idx = found_idx + 1
+                    matched += 1
+                else:
+                    fallback += 1
+                    if start_time is None:
+                        start_time = starts[char_idx]
+                    end_time = ends[char_idx]
+                    current_time = ends[char_idx]
+                    char_idx += 1
+            
+            return start_time, end_time, char_idx, current_time, matched, fallback
+        
+        return match_line
+    
     def _format_timestamp(self, seconds: float) -> str:
-        """將秒數轉換為 SRT 時間格式"""
-        millis = int((seconds % 1) * 1000)
-        seconds = int(seconds)
-        minutes = seconds // 60
-        hours = minutes // 60
-        minutes %= 60
-        seconds %= 60
-        return f"{hours:02}:{minutes:02}:{seconds:02},{millis:03}"
+        """
+        將秒數轉換為 SRT 時間格式
+        
+        先換算成整數毫秒再拆分，避免 (seconds % 1) * 1000 的浮點誤差
+        （例如 1.001 秒會被截成 000 毫秒）。
+        """
+        total_ms = round(seconds * 1000)
+        seconds, millis = divmod(total_ms, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return "%02d:%02d:%02d,%03d" % (hours, minutes, seconds, millis)
     
     def _save_srt(self, subtitles: list, output_path: Path):
-        """儲存 SRT 檔案"""
+        """儲存 SRT 檔案（先組成完整內容，再一次寫入）"""
+        format_timestamp = self._format_timestamp
+        blocks = [
+            f"{i}\n{format_timestamp(sub['start'])} --> {format_timestamp(sub['end'])}\n"
+            f"{_TRAILING_PUNCT_RE.sub('', sub['text'])}\n\n"
+            for i, sub in enumerate(subtitles, 1)
+        ]
+        
         with open(output_path, "w", encoding="utf-8") as f:
-            for i, sub in enumerate(subtitles, 1):
-                start = self._format_timestamp(sub["start"])
-                end = self._format_timestamp(sub["end"])
-                text = re.sub(r'[，。、；：,.]+$', '', sub["text"])
-                f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+            f.write("".join(blocks))
         
         print(f"✅ 成功！字幕已儲存至：{output_path}")
         print(f"   共 {len(subtitles)} 行字幕")
     
     def _save_debug_json(self, path: Path, data):
-        """儲存除錯用 JSON"""
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """儲存除錯用 JSON（一次編碼成 UTF-8 bytes 後整塊寫入）"""
+        if orjson is not None:
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        
+        with open(path, "wb") as f:
+            f.write(payload)
         print(f"   💾 除錯結果已儲存：{path}")
     
     def _save_debug_text(self, path: Path, lines: list):
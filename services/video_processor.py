@@ -29,7 +29,8 @@ class VideoProcessor:
         output_path: Path = None,
         skip_subtitle: bool = False,
         encoding_preset: str = "medium",
-        debug: bool = True
+        debug: bool = True,
+        use_cache: bool = True
     ) -> Path:
         """
         完整處理流程：字幕生成 + 影片合成
@@ -39,6 +40,7 @@ class VideoProcessor:
             output_path: 輸出影片路徑（可選）
             skip_subtitle: 是否跳過字幕生成（如果已有 SRT 檔）
             debug: 是否儲存中間結果供除錯
+            use_cache: 是否使用 Whisper 快取
             
         Returns:
             生成的影片檔案路徑
@@ -59,7 +61,7 @@ class VideoProcessor:
                 print("   如需重新生成，請刪除現有檔案或使用 skip_subtitle=False")
             else:
                 print("\n📝 開始生成字幕...")
-                self.subtitle_service.generate(folder_path, debug=debug)
+                self.subtitle_service.generate(folder_path, debug=debug, use_cache=use_cache)
         elif skip_subtitle:
             print("\n⏭️  跳過字幕生成（skip_subtitle=True）")
         else:
@@ -83,7 +85,8 @@ class VideoProcessor:
     def generate_subtitle_only(
         self,
         folder_path: Path,
-        debug: bool = True
+        debug: bool = True,
+        use_cache: bool = True
     ) -> Path:
         """
         僅生成字幕（不合成影片）
@@ -91,11 +94,12 @@ class VideoProcessor:
         Args:
             folder_path: 素材資料夾路徑
             debug: 是否儲存中間結果
+            use_cache: 是否使用 Whisper 快取
             
         Returns:
             生成的 SRT 檔案路徑
         """
-        return self.subtitle_service.generate(folder_path, debug=debug)
+        return self.subtitle_service.generate(folder_path, debug=debug, use_cache=use_cache)
     
     def assemble_video_only(
         self,
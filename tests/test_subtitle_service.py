@@ -0,0 +1,505 @@
+"""
+Unit tests for subtitle_service.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock, patch
+
+# 加入專案根目錄到 path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+
+from engines import alignment_engine
+from services import subtitle_service
+from services.subtitle_service import AlignedChars, SubtitleService, _diff_opcodes, _paragraph_opcodes
+
+
+def make_service() -> SubtitleService:
+    """建立不連線外部 API 的 SubtitleService"""
+    with patch('services.subtitle_service.get_openai_client'), \
+         patch('services.subtitle_service.get_openrouter_client'):
+        return SubtitleService()
+
+
+def make_words(text: str, step: float = 0.5) -> list:
+    """將文字拆成每字一個 Whisper 字級時間戳"""
+    return [
+        {"word": char, "start": i * step, "end": (i + 1) * step}
+        for i, char in enumerate(text)
+    ]
+
+
+def make_aligned(text: str, step: float = 0.5) -> AlignedChars:
+    """建立每字等長的 aligned_chars"""
+    bounds = np.arange(len(text) + 1) * step
+    return AlignedChars(text, bounds[:-1], bounds[1:])
+
+
+class TestValidateFiles(unittest.TestCase):
+
+    def test_missing_files(self):
+        """依序檢查 Avatar 影片與逐字稿，缺檔時回報完整路徑"""
+        service = make_service()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = Path(temp_dir)
+            avatar_path = folder / service.AVATAR_FILENAME
+            script_path = folder / service.SCRIPT_FILENAME
+            with self.assertRaisesRegex(FileNotFoundError, "Avatar"):
+                service._validate_files(avatar_path, script_path)
+            avatar_path.touch()
+            with self.assertRaisesRegex(FileNotFoundError, "逐字稿"):
+                service._validate_files(avatar_path, script_path)
+            script_path.touch()
+            service._validate_files(avatar_path, script_path)
+
+    def test_missing_folder(self):
+        folder = Path("/nonexistent/folder")
+        with self.assertRaises(FileNotFoundError):
+            make_service()._validate_files(folder / "avatar_full.mp4", folder / "full_script.txt")
+
+    def test_folder_is_a_file(self):
+        """資料夾路徑指向檔案時同樣回報 FileNotFoundError"""
+        service = make_service()
+        with tempfile.NamedTemporaryFile() as f:
+            folder = Path(f.name)
+            with self.assertRaises(FileNotFoundError):
+                service._validate_files(folder / service.AVATAR_FILENAME, folder / service.SCRIPT_FILENAME)
+
+
+class TestSanitizeScript(unittest.TestCase):
+
+    def test_sanitize_rules(self):
+        """刪除引號括號、頓號分號轉逗號、冒號轉空格、刪除破折號省略號、中英文間加空格"""
+        service = make_service()
+        text = "他說：「《AI》(人工智慧)很強、很快；真的——對吧……GPT4很好..."
+        self.assertEqual(
+            service._sanitize_script(text),
+            "他說 AI 人工智慧很強，很快，真的對吧 GPT4 很好"
+        )
+
+
+class TestConvertWords(unittest.TestCase):
+
+    def setUp(self):
+        self.service = make_service()
+
+    def test_bulk_conversion(self):
+        """批次簡轉繁，重複詞只轉換一次"""
+        words = ["这个", "问题", "这个", "OK"]
+        self.assertEqual(self.service._convert_words(words), ["這個", "問題", "這個", "OK"])
+        self.assertEqual(set(self.service._cc_cache), {"这个", "问题", "OK"})
+
+    def test_separator_lost_falls_back_per_word(self):
+        """分隔符被吃掉時退回逐詞轉換"""
+        convert = self.service.cc.convert
+        self.service.cc = Mock()
+        self.service.cc.convert.side_effect = lambda text: convert(text.replace("\x1f", ""))
+        self.assertEqual(self.service._convert_words(["这个", "问题"]), ["這個", "問題"])
+
+
+class TestForceAlignment(unittest.TestCase):
+
+    def setUp(self):
+        self.service = make_service()
+
+    def test_identical_input_skips_matcher(self):
+        """Whisper 與逐字稿完全相同時不呼叫 SequenceMatcher"""
+        words = make_words("今天天氣很好")
+        with patch('services.subtitle_service.SequenceMatcher') as mock_matcher:
+            aligned = self.service._step2_force_alignment(words, "今天天氣很好")
+        mock_matcher.assert_not_called()
+        self.assertEqual(aligned.chars, "今天天氣很好")
+        self.assertEqual(aligned.starts[2], 1.0)
+        self.assertEqual(aligned.ends[2], 1.5)
+
+    def test_replace_uses_script_text(self):
+        """聽錯字時保留逐字稿文字並借用 Whisper 時間"""
+        words = make_words("今天天汽很好")
+        aligned = self.service._step2_force_alignment(words, "今天天氣很好")
+        self.assertEqual(aligned.chars, "今天天氣很好")
+        self.assertEqual(aligned.starts[3], 1.5)
+        self.assertEqual(aligned.ends[3], 2.0)
+
+    def test_insert_interpolates_until_next_timestamp(self):
+        """Whisper 漏字時在前後時間之間插值"""
+        words = make_words("今天很好")
+        aligned = self.service._step2_force_alignment(words, "今天天氣很好")
+        self.assertEqual(aligned.chars, "今天天氣很好")
+        self.assertEqual(aligned.starts[2], 1.0)
+        self.assertEqual(aligned.ends[3], 1.0)
+
+    def test_empty_input(self):
+        self.assertEqual(len(self.service._step2_force_alignment([], "")), 0)
+
+    def test_to_list_for_debug_output(self):
+        """除錯輸出轉回 list of dict，數值為 Python float"""
+        aligned = self.service._step2_force_alignment(make_words("你好"), "你好")
+        self.assertEqual(aligned.to_list(), [
+            {"char": "你", "start": 0.0, "end": 0.5},
+            {"char": "好", "start": 0.5, "end": 1.0},
+        ])
+        self.assertIs(type(aligned.to_list()[0]["start"]), float)
+
+
+class TestDiffOpcodes(unittest.TestCase):
+
+    def assert_valid_opcodes(self, a, b, opcodes):
+        """opcodes 必須連續覆蓋兩個字串，且 equal 區段內容相同"""
+        i = j = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            self.assertEqual((i1, j1), (i, j))
+            if tag == 'equal':
+                self.assertEqual(a[i1:i2], b[j1:j2])
+            i, j = i2, j2
+        self.assertEqual((i, j), (len(a), len(b)))
+
+    def test_common_prefix_and_suffix_trimmed(self):
+        """只有中間不同的區段送進比對器，索引需位移回原字串"""
+        a = "今天天氣很好我們去散步"
+        b = "今天天汽很好我們去散步吧"
+        opcodes = _diff_opcodes(a, b)
+        self.assert_valid_opcodes(a, b, opcodes)
+        self.assertEqual(opcodes[0], ('equal', 0, 3, 0, 3))
+        self.assertIn(('replace', 3, 4, 3, 4), opcodes)
+        self.assertEqual(opcodes[-1], ('insert', 11, 11, 11, 12))
+
+    def test_fully_different(self):
+        opcodes = _diff_opcodes("甲乙", "丙丁戊")
+        self.assert_valid_opcodes("甲乙", "丙丁戊", opcodes)
+
+    def test_one_side_empty(self):
+        self.assertEqual(_diff_opcodes("", "你好"), [('insert', 0, 0, 0, 2)])
+        self.assertEqual(_diff_opcodes("你好", ""), [('delete', 0, 2, 0, 0)])
+
+    @patch('services.subtitle_service.Levenshtein', None)
+    @patch('services.subtitle_service.AlignmentConfig.MATCHER', 'levenshtein')
+    def test_levenshtein_falls_back_to_difflib(self):
+        """設定 levenshtein 但未安裝時退回 SequenceMatcher"""
+        a, b = "今天天汽很好", "今天天氣很好吧"
+        opcodes = _diff_opcodes(a, b)
+        self.assert_valid_opcodes(a, b, opcodes)
+        self.assertIn(('replace', 3, 4, 3, 4), opcodes)
+
+    @unittest.skipIf(subtitle_service.Levenshtein is None, "未安裝 rapidfuzz")
+    @patch('services.subtitle_service.AlignmentConfig.MATCHER', 'levenshtein')
+    def test_levenshtein_matcher(self):
+        """rapidfuzz 的 opcodes 轉為與 SequenceMatcher 相同的 tuple 格式"""
+        a, b = "今天天汽很好", "今天天氣很好吧"
+        self.assertEqual(
+            _diff_opcodes(a, b),
+            [('equal', 0, 3, 0, 3), ('replace', 3, 4, 3, 4), ('equal', 4, 6, 4, 6), ('insert', 6, 6, 6, 7)],
+        )
+
+    @patch('services.subtitle_service.AlignmentConfig.MATCHER', 'dtw')
+    def test_dtw_matcher(self):
+        """DTW 核心（Numba 與純 Python）輸出合法且相同的 opcodes"""
+        a, b = "今天天汽很好我們去散步", "今天天氣很好，我們散步吧"
+        expected = [
+            ('equal', 0, 3, 0, 3), ('replace', 3, 4, 3, 4), ('equal', 4, 6, 4, 6),
+            ('insert', 6, 6, 6, 7), ('equal', 6, 8, 7, 9), ('delete', 8, 9, 9, 9),
+            ('equal', 9, 11, 9, 11), ('insert', 11, 11, 11, 12),
+        ]
+        self.assertEqual(_diff_opcodes(a, b), expected)
+        with patch('engines.alignment_engine.edit_opcodes', alignment_engine._edit_opcodes):
+            self.assertEqual(_diff_opcodes(a, b), expected)
+
+    def test_dtw_widens_band_for_local_drift(self):
+        """長度相同但開頭漏字、結尾多字時，帶寬加倍直到涵蓋最佳路徑"""
+        text = "".join(chr(0x4e00 + (i * 37) % 2000) for i in range(700))
+        whisper, script = text[200:], text[:500]
+        opcodes = alignment_engine.dtw_opcodes(whisper, script)
+        self.assert_valid_opcodes(whisper, script, opcodes)
+        self.assertEqual(sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal'), 300)
+
+    @patch('engines.alignment_engine.MAX_BAND_CELLS', 0)
+    @patch('services.subtitle_service.AlignmentConfig.MATCHER', 'dtw')
+    def test_dtw_band_too_large_falls_back_to_difflib(self):
+        text = "".join(chr(0x4e00 + (i * 37) % 2000) for i in range(700))
+        whisper, script = text[200:], text[:500]
+        self.assertIsNone(alignment_engine.dtw_opcodes(whisper, script))
+        opcodes = _diff_opcodes(whisper, script)
+        self.assert_valid_opcodes(whisper, script, opcodes)
+        self.assertEqual(sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal'), 300)
+
+    def test_dtw_large_length_difference_skips_kernel(self):
+        """長度差上萬字時第一次的帶就超過上限，不配置回溯矩陣直接退回"""
+        script = "".join(chr(0x4e00 + (i * 37) % 2000) for i in range(20000))
+        whisper = script[:12000]
+        with patch('engines.alignment_engine.edit_opcodes') as mock_kernel:
+            self.assertIsNone(alignment_engine.dtw_opcodes(script, whisper))
+        mock_kernel.assert_not_called()
+
+    def test_paragraph_cuts_follow_whisper_text(self):
+        """逐段比對：Whisper 缺標點、有錯字時，段落切點仍落在正確位置"""
+        paragraphs = ["今天天氣很好。", "我們一起去公園散步吧。", "晚上回家吃飯。"]
+        whisper = "今天天汽很好我們一起去公園散步吧晚上回家吃飯"
+        script = "".join(paragraphs)
+        opcodes = _paragraph_opcodes(whisper, paragraphs)
+        self.assert_valid_opcodes(whisper, script, opcodes)
+        self.assertIn(('equal', 6, 16, 7, 17), opcodes)
+        self.assertIn(('equal', 16, 22, 18, 24), opcodes)
+
+
+class TestAlignTimestamps(unittest.TestCase):
+
+    def setUp(self):
+        self.service = make_service()
+
+    def test_punctuation_added_by_ai_is_skipped(self):
+        """AI 新增的標點不參與匹配，也不會造成偏移"""
+        aligned = make_aligned("今天天氣很好我們去散步")
+        subtitles = self.service._step4_align_timestamps(
+            ["今天天氣很好，", "我們去散步。"], aligned
+        )
+        self.assertEqual([(s["start"], s["end"]) for s in subtitles], [(0.0, 3.0), (3.0, 5.5)])
+        self.assertEqual(subtitles[0]["text"], "今天天氣很好，")
+
+    def test_numba_and_python_matchers_agree(self):
+        """Numba 核心與純 Python（str.find 視窗搜尋）實作結果一致"""
+        aligned = make_aligned("今天天氣很好我們去散步吧大家一起走")
+        lines = ["今天天氣，很好", "我們去跑步吧", "", "大家一起走走走走"]
+        with patch('services.subtitle_service.alignment_engine.NUMBA_AVAILABLE', False):
+            expected = self.service._step4_align_timestamps(lines, aligned)
+        with patch('services.subtitle_service.alignment_engine.NUMBA_AVAILABLE', True):
+            actual = self.service._step4_align_timestamps(lines, aligned)
+        self.assertEqual(actual, expected)
+
+    def test_lines_past_end_reuse_last_time(self):
+        """字幕比 aligned_chars 長時，超出部分沿用最後時間並計入 fallback"""
+        aligned = make_aligned("你好", step=1.0)
+        lines = ["你好世界", "再見"]
+        for numba_available in (False, True):
+            with patch('services.subtitle_service.alignment_engine.NUMBA_AVAILABLE', numba_available):
+                match_line = self.service._build_line_matcher(aligned)
+                self.assertEqual(match_line("你好世界", 0, 0.0), (0.0, 2.0, 2, 2.0, 2, 2))
+                subtitles = self.service._step4_align_timestamps(lines, aligned)
+            self.assertEqual([(s["start"], s["end"]) for s in subtitles], [(0.0, 2.0), (2.0, 2.5)])
+
+    def test_match_outside_search_window_falls_back(self):
+        """搜尋視窗（100 字）外的相同字元不會被匹配，改用 fallback 時間"""
+        aligned = make_aligned("甲" * 100 + "乙", step=1.0)
+        subtitles = self.service._step4_align_timestamps(["乙"], aligned)
+        self.assertEqual((subtitles[0]["start"], subtitles[0]["end"]), (0.0, 1.0))
+
+
+class TestPipelineCache(unittest.TestCase):
+
+    @patch('services.subtitle_service.subprocess.run')
+    def test_encode_audio_is_bitexact(self, mock_run):
+        """Ogg 串流序號固定，同一支影片每次提取的 bytes 相同（快取鍵才會命中）"""
+        mock_run.return_value = Mock(returncode=0, stdout=b"audio", stderr=b"")
+        make_service()._encode_audio(Path("avatar_full.mp4"), 24000)
+        argv = mock_run.call_args.args[0]
+        self.assertIn(['-fflags', '+bitexact'], [argv[i:i + 2] for i in range(len(argv))])
+        self.assertIn(['-flags:a', '+bitexact'], [argv[i:i + 2] for i in range(len(argv))])
+        self.assertLess(argv.index('-fflags'), argv.index('pipe:1'))
+
+    @patch('services.subtitle_service.CacheConfig.CACHE_SEGMENTS', True)
+    def test_second_run_uses_cache(self):
+        """相同音訊與逐字稿重跑時，Whisper 與 AI 斷句直接讀取快取"""
+        service = make_service()
+        service._extract_audio = Mock(return_value=b"audio")
+        service._step1_transcribe_whisper = AsyncMock(return_value=make_words("你好"))
+        service._step3_segment_text = AsyncMock(return_value=["你好"])
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_dir = Path(cache_dir)
+            avatar_path = Path("avatar_full.mp4")
+            
+            first = asyncio.run(service._run_pipeline(avatar_path, "你好", cache_dir))
+            second = asyncio.run(service._run_pipeline(avatar_path, "你好", cache_dir))
+            # 逐字稿變動時重新斷句，音訊未變動時仍沿用 Whisper 快取
+            asyncio.run(service._run_pipeline(avatar_path, "你好嗎", cache_dir))
+            # 音訊內容不同時重新辨識
+            service._extract_audio.return_value = b"other audio"
+            asyncio.run(service._run_pipeline(avatar_path, "你好", cache_dir))
+        
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(second[2], ["你好"])
+        self.assertEqual(service._step1_transcribe_whisper.await_count, 2)
+        self.assertEqual(service._step3_segment_text.await_count, 2)
+
+    @patch('services.subtitle_service.CacheConfig.CACHE_SEGMENTS', False)
+    def test_segments_not_cached_by_default(self):
+        """AI 斷句溫度不為 0，未開啟 CACHE_SEGMENTS 時每次重跑都重新斷句"""
+        service = make_service()
+        service._extract_audio = Mock(return_value=b"audio")
+        service._step1_transcribe_whisper = AsyncMock(return_value=make_words("你好"))
+        service._step3_segment_text = AsyncMock(return_value=["你好"])
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                asyncio.run(service._run_pipeline(Path("avatar_full.mp4"), "你好", Path(cache_dir)))
+
+        service._step1_transcribe_whisper.assert_awaited_once()
+        self.assertEqual(service._step3_segment_text.await_count, 2)
+
+    def test_local_model_change_invalidates_whisper_cache(self):
+        """faster-whisper 換模型時不沿用舊模型的辨識結果"""
+        service = make_service()
+        service._extract_audio = Mock(return_value=b"audio")
+        service._step1_transcribe_whisper = AsyncMock(return_value=make_words("你好"))
+
+        with tempfile.TemporaryDirectory() as cache_dir, \
+             patch('services.subtitle_service.WhisperConfig.BACKEND', 'faster-whisper'):
+            for model in ("small", "small", "large-v3"):
+                with patch('services.subtitle_service.WhisperConfig.LOCAL_MODEL', model):
+                    asyncio.run(service._transcribe_with_cache(Path("avatar_full.mp4"), Path(cache_dir)))
+
+        self.assertEqual(service._step1_transcribe_whisper.await_count, 2)
+
+    def test_corrupt_cache_treated_as_miss(self):
+        """快取檔寫到一半（損毀）時重新辨識並覆寫，不中斷流程"""
+        service = make_service()
+        service._extract_audio = Mock(return_value=b"audio")
+        service._step1_transcribe_whisper = AsyncMock(return_value=make_words("你好"))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_dir = Path(cache_dir)
+            asyncio.run(service._transcribe_with_cache(Path("avatar_full.mp4"), cache_dir))
+            (cache_path,) = (cache_dir / "whisper").iterdir()
+            cache_path.write_bytes(cache_path.read_bytes()[:10])
+
+            words = asyncio.run(service._transcribe_with_cache(Path("avatar_full.mp4"), cache_dir))
+
+            self.assertEqual(words, make_words("你好"))
+            self.assertEqual(service._step1_transcribe_whisper.await_count, 2)
+            self.assertEqual([p.name for p in (cache_dir / "whisper").iterdir()], [cache_path.name])
+
+    def test_generate_writes_debug_files(self):
+        """除錯檔在背景寫入，generate 回傳前全部寫完"""
+        service = make_service()
+        service._extract_audio = Mock(return_value=b"audio")
+        service._step1_transcribe_whisper = AsyncMock(return_value=make_words("你好"))
+        service._step3_segment_text = AsyncMock(return_value=["你好"])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = Path(temp_dir)
+            (folder / service.AVATAR_FILENAME).touch()
+            (folder / service.SCRIPT_FILENAME).write_text("你好", encoding="utf-8")
+
+            output_path = service.generate(folder, debug=True, use_cache=False)
+
+            self.assertTrue(output_path.exists())
+            for name in ("_debug_sanitized_script.txt", "_debug_step1_whisper.json",
+                         "_debug_step2_alignment.json", "_debug_step3_ai_segments.txt"):
+                self.assertTrue((folder / name).exists(), name)
+
+    def test_debug_files_kept_when_later_step_fails(self):
+        """Step 2 / Step 3 失敗時，已完成步驟的除錯檔仍會寫出"""
+        service = make_service()
+        service._extract_audio = Mock(return_value=b"audio")
+        service._step1_transcribe_whisper = AsyncMock(return_value=make_words("你好"))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            folder = Path(temp_dir)
+            (folder / service.AVATAR_FILENAME).touch()
+            (folder / service.SCRIPT_FILENAME).write_text("你好", encoding="utf-8")
+
+            # Step 3 失敗：Step 1、Step 2 的結果已寫出
+            service._step3_segment_text = AsyncMock(side_effect=RuntimeError("429"))
+            with self.assertRaisesRegex(RuntimeError, "429"):
+                service.generate(folder, debug=True, use_cache=False)
+            self.assertTrue((folder / "_debug_step1_whisper.json").exists())
+            self.assertTrue((folder / "_debug_step2_alignment.json").exists())
+            self.assertFalse((folder / "_debug_step3_ai_segments.txt").exists())
+
+            # Step 2 失敗：Step 1 的結果已寫出
+            (folder / "_debug_step1_whisper.json").unlink()
+            (folder / "_debug_step2_alignment.json").unlink()
+            service._step3_segment_text = AsyncMock(return_value=["你好"])
+            service._step2_force_alignment = Mock(side_effect=ValueError("alignment"))
+            with self.assertRaisesRegex(ValueError, "alignment"):
+                service.generate(folder, debug=True, use_cache=False)
+            self.assertTrue((folder / "_debug_step1_whisper.json").exists())
+            self.assertFalse((folder / "_debug_step2_alignment.json").exists())
+
+
+class TestSaveSrt(unittest.TestCase):
+
+    def test_format_timestamp_no_float_truncation(self):
+        service = make_service()
+        self.assertEqual(service._format_timestamp(1.001), "00:00:01,001")
+        self.assertEqual(service._format_timestamp(59.9996), "00:01:00,000")
+
+    def test_srt_format(self):
+        """SRT 編號、時間格式與行尾標點移除"""
+        service = make_service()
+        subtitles = [
+            {"start": 0.0, "end": 1.5, "text": "今天天氣很好，"},
+            {"start": 3661.25, "end": 3662.0, "text": "我們去散步。"},
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = Path(temp_dir) / "out.srt"
+            service._save_srt(subtitles, output_path)
+            content = output_path.read_text(encoding="utf-8")
+        self.assertEqual(content, (
+            "1\n00:00:00,000 --> 00:00:01,500\n今天天氣很好\n\n"
+            "2\n01:01:01,250 --> 01:01:02,000\n我們去散步\n\n"
+        ))
+
+
+class TestSegmentation(unittest.TestCase):
+
+    def setUp(self):
+        self.service = make_service()
+
+    def test_short_transcript_single_chunk(self):
+        transcript = "第一段。\n第二段。"
+        self.assertEqual(self.service._split_transcript(transcript), [transcript])
+
+    def test_segment_chunk_lines_have_no_line_breaks(self):
+        """AI 回應的 code fence 與 CRLF 換行都會被清除"""
+        self.service.openrouter_client.chat_completion_async = AsyncMock(
+            return_value="```\r\n今天天氣很好\r\n\r\n我們去散步\r\n```"
+        )
+        lines = asyncio.run(self.service._segment_chunk("今天天氣很好我們去散步"))
+        self.assertEqual(lines, ["今天天氣很好", "我們去散步"])
+
+    def test_segment_concurrency_limited(self):
+        """同時送出的區塊數不超過 SEGMENT_MAX_CONCURRENCY，結果仍依區塊順序合併"""
+        self.service.SEGMENT_MAX_CONCURRENCY = 2
+        chunks = [str(i) for i in range(6)]
+        self.service._split_transcript = Mock(return_value=chunks)
+        in_flight = []
+        peak = []
+
+        async def fake_segment(chunk):
+            in_flight.append(chunk)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(chunk)
+            return [chunk]
+
+        self.service._segment_chunk = fake_segment
+        lines = asyncio.run(self.service._step3_segment_text("".join(chunks)))
+        self.assertEqual(lines, chunks)
+        self.assertEqual(max(peak), 2)
+
+    @patch('services.subtitle_service._count_tokens', len)
+    def test_long_transcript_split_on_paragraphs(self):
+        """超過門檻時依段落打包，不切斷段落"""
+        self.service.SEGMENT_TOKEN_THRESHOLD = 10
+        self.service.SEGMENT_CHUNK_TOKENS = 8
+        transcript = "一二三四五\n六七八\n\n九十\n甲乙丙丁戊己庚辛壬"
+        chunks = self.service._split_transcript(transcript)
+        self.assertEqual(chunks, ["一二三四五\n六七八", "九十", "甲乙丙丁戊己庚辛壬"])
+
+    @patch('services.subtitle_service._count_tokens', len)
+    def test_long_paragraph_split_on_sentences(self):
+        """單一段落過長時在句尾切開，同段落的句子不插入換行"""
+        self.service.SEGMENT_TOKEN_THRESHOLD = 10
+        self.service.SEGMENT_CHUNK_TOKENS = 8
+        transcript = "一二。三四！五六七。八九？\n十"
+        chunks = self.service._split_transcript(transcript)
+        self.assertEqual(chunks, ["一二。三四！", "五六七。八九？\n十"])
+
+
+if __name__ == '__main__':
+    unittest.main()